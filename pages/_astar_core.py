@@ -0,0 +1,157 @@
+"""
+A* 경로 탐색 순수 파이썬 코어
+Numba를 쓸 수 없는 환경(PyPy 등)을 위한 대체 구현으로 list, heapq, float만 사용
+입력과 출력은 astar.py의 Numba 커널과 같은 형태 (CSR 배열 대신 리스트)
+"""
+import heapq
+import math
+
+
+# 평균 속도 50km/h (m/s), 대기 시간을 거리로 환산할 때 사용
+AVERAGE_SPEED = 13.89
+# 이동 시간 계산용 역수 (루프 안의 나눗셈을 곱셈으로 대체)
+INV_AVERAGE_SPEED = 1.0 / AVERAGE_SPEED
+
+
+def goal_distance(node_lat, node_lon, goal_lat, goal_lon, lon_scale):
+    """
+    목표까지의 등장방형 근사 거리 (미터)
+    목표 좌표와 경도 환산 계수(111000 * cos_lat_ref)는 호출하는 쪽에서 한 번만 계산해 전달
+    """
+    return math.hypot((node_lat - goal_lat) * 111000.0, (node_lon - goal_lon) * lon_scale)
+
+
+def landmark_bound(lm_from, lm_to, node, goal, h_cost):
+    """
+    ALT 랜드마크 하한과 h_cost 중 큰 값 반환
+    
+    랜드마크 L마다 삼각 부등식 d(v, t) >= d(L, t) - d(L, v), d(v, t) >= d(v, L) - d(t, L) 적용
+    도달할 수 없는 랜드마크에서 나온 inf 항과 inf - inf = nan 항은 비교가 거짓이므로 제외
+    
+    Args:
+        lm_from: 노드별 랜드마크에서의 거리 (행 = 노드, 열 = 랜드마크)
+        lm_to: 노드별 랜드마크까지의 거리
+        node: 현재 노드의 행 번호
+        goal: 목표 노드의 행 번호
+        h_cost: 다른 방법으로 구한 하한 (등장방형 근사 거리)
+        
+    Returns:
+        목표까지의 거리 하한 (미터)
+    """
+    from_row = lm_from[node]
+    to_row = lm_to[node]
+    goal_from = lm_from[goal]
+    goal_to = lm_to[goal]
+    for k in range(len(from_row)):
+        bound = goal_from[k] - from_row[k]
+        if bound > h_cost and bound < math.inf:
+            h_cost = bound
+        bound = to_row[k] - goal_to[k]
+        if bound > h_cost and bound < math.inf:
+            h_cost = bound
+    return h_cost
+
+
+def wait_time(cycle, green, phase_start, red_first, current_time):
+    """TrafficLightPredictor.get_wait_time과 동일한 규칙의 대기 시간 계산 (cycle <= 0이면 신호등 없음)"""
+    if cycle <= 0.0:
+        return 0.0
+    
+    cycle_position = (current_time - phase_start) % cycle
+    red = cycle - green
+    
+    if red_first:
+        return red - cycle_position if cycle_position < red else 0.0
+    if cycle_position < green:
+        # 녹색 신호가 5초 이하로 남았으면 빨간 신호 전체를 기다림
+        return red if green - cycle_position <= 5.0 else 0.0
+    return cycle - cycle_position
+
+
+def edge_cost(edge, current_time, lengths, tl_cycle, tl_green, tl_phase0, tl_red_first):
+    """엣지 위치 기준 (거리 + 대기 시간 환산 거리, 대기 시간) 계산"""
+    wait = wait_time(tl_cycle[edge], tl_green[edge], tl_phase0[edge],
+                     tl_red_first[edge], current_time)
+    return lengths[edge] + wait * AVERAGE_SPEED, wait
+
+
+def astar(indptr, indices, lengths, lat, lon, cos_lat_ref,
+          tl_cycle, tl_green, tl_phase0, tl_red_first, lm_from, lm_to,
+          start, goal, start_time):
+    """
+    CSR 리스트 위에서 동작하는 A* 탐색
+    휴리스틱은 등장방형 근사 거리와 ALT 랜드마크 하한(lm_from, lm_to의 행) 중 큰 값
+    
+    Returns:
+        (경로 행 번호 리스트, 총 비용, 탐색 노드 수, 신호등 수, 총 대기 시간) 튜플
+        경로가 없으면 빈 리스트와 inf 반환
+    """
+    n = len(lat)
+    inf = float('inf')
+    g_cost = [inf] * n
+    parent = [-1] * n
+    arrival = [inf] * n
+    closed = [False] * n
+    
+    # 목표 좌표와 경도 환산 계수는 루프 밖에서 한 번만 계산
+    goal_lat = lat[goal]
+    goal_lon = lon[goal]
+    lon_scale = 111000.0 * cos_lat_ref
+    
+    g_cost[start] = 0.0
+    arrival[start] = start_time
+    h_cost = goal_distance(lat[start], lon[start], goal_lat, goal_lon, lon_scale)
+    open_list = [(landmark_bound(lm_from, lm_to, start, goal, h_cost), start)]
+    
+    nodes_explored = 0
+    traffic_lights_encountered = 0
+    total_wait_time = 0.0
+    
+    while open_list:
+        _, current = heapq.heappop(open_list)
+        
+        # 더 좋은 경로로 이미 꺼낸 노드의 오래된 항목은 스킵
+        if closed[current]:
+            continue
+        closed[current] = True
+        
+        if current == goal:
+            path = []
+            node = goal
+            while node != -1:
+                path.append(node)
+                node = parent[node]
+            path.reverse()
+            
+            return (path, g_cost[goal], nodes_explored,
+                    traffic_lights_encountered, total_wait_time)
+        
+        nodes_explored += 1
+        current_time = arrival[current]
+        current_g_cost = g_cost[current]
+        
+        for edge in range(indptr[current], indptr[current + 1]):
+            neighbor = indices[edge]
+            if closed[neighbor]:
+                continue
+            
+            cost, wait = edge_cost(edge, current_time, lengths,
+                                   tl_cycle, tl_green, tl_phase0, tl_red_first)
+            
+            if wait > 0:
+                traffic_lights_encountered += 1
+                total_wait_time += wait
+            
+            tentative_g_cost = current_g_cost + cost
+            
+            if tentative_g_cost < g_cost[neighbor]:
+                g_cost[neighbor] = tentative_g_cost
+                parent[neighbor] = current
+                arrival[neighbor] = current_time + cost * INV_AVERAGE_SPEED
+                # 휴리스틱은 더 좋은 경로를 찾은 경우에만 계산
+                h_cost = goal_distance(lat[neighbor], lon[neighbor], goal_lat, goal_lon, lon_scale)
+                h_cost = landmark_bound(lm_from, lm_to, neighbor, goal, h_cost)
+                f_cost = tentative_g_cost + h_cost
+                heapq.heappush(open_list, (f_cost, neighbor))
+    
+    return [], inf, nodes_explored, traffic_lights_encountered, total_wait_time
@@ -2,10 +2,15 @@
 신호등 잔여시간 예측을 통한 A* 길찾기 웹 애플리케이션
 Streamlit 기반
 """
+import copy
 import streamlit as st
 import folium
 from streamlit_folium import st_folium
+import numpy as np
 import pandas as pd
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Tuple
 from road_network import RoadNetwork
 from traffic_light import TrafficLightPredictor
 from astar import AStarPathfinder
@@ -28,26 +33,123 @@ if 'pathfinder' not in st.session_state:
     st.session_state.pathfinder = None
 if 'path_result' not in st.session_state:
     st.session_state.path_result = None
+if 'place_name' not in st.session_state:
+    st.session_state.place_name = None
+
+
+@st.cache_resource
+def _get_executor() -> ThreadPoolExecutor:
+    """도로 네트워크 로드용 백그라운드 스레드 풀 (재실행 간 공유)"""
+    return ThreadPoolExecutor(max_workers=2)
+
+
+class NetworkLoadError(Exception):
+    """OSM 다운로드에 실패해 더미 네트워크로 대체된 경우 (캐시하지 않고 다음 로드 때 다시 시도)"""
+    
+    def __init__(self, place_name: str, fallback: Tuple[RoadNetwork, TrafficLightPredictor, AStarPathfinder]):
+        super().__init__(f"'{place_name}' 도로 네트워크를 불러오지 못해 더미 네트워크를 사용합니다")
+        self.fallback = fallback
+
+
+def _build_network(place_name: str) -> Tuple[RoadNetwork, TrafficLightPredictor, AStarPathfinder]:
+    """
+    도로 네트워크, 신호등 예측기, 경로 탐색기 생성
+    
+    Raises:
+        NetworkLoadError: 다운로드에 실패해 더미 네트워크로 대체된 경우
+    """
+    network = RoadNetwork()
+    network.load_from_place(place_name)
+    
+    predictor = TrafficLightPredictor()
+    predictor.auto_detect_traffic_lights(network)
+    
+    pathfinder = AStarPathfinder(network, predictor)
+    
+    # load_from_place는 실패 시 graph 없이 더미 네트워크를 만듦
+    if network.graph is None:
+        raise NetworkLoadError(place_name, (network, predictor, pathfinder))
+    
+    return network, predictor, pathfinder
+
+
+@st.cache_resource
+def _network_tasks() -> Tuple[Dict[str, Future], threading.Lock]:
+    """
+    지역 이름별 도로 네트워크 로드 작업과 그 잠금
+    Future 자체를 공유하므로 진행 중인 로드도 재실행이나 다른 세션과 공유됨
+    """
+    return {}, threading.Lock()
+
+
+def _network_future(place_name: str) -> Future:
+    """지역의 로드 작업 반환 (없으면 백그라운드에서 시작)"""
+    futures, lock = _network_tasks()
+    with lock:
+        future = futures.get(place_name)
+        if future is None:
+            future = _get_executor().submit(_build_network, place_name)
+            futures[place_name] = future
+    return future
+
+
+def _evict_network_future(place_name: str, future: Future):
+    """실패한 지역의 로드 작업만 제거 (다른 지역의 캐시는 유지)"""
+    futures, lock = _network_tasks()
+    with lock:
+        if futures.get(place_name) is future:
+            del futures[place_name]
 
 
 def load_network(place_name: str = "Gwangju, South Korea"):
     """도로 네트워크 로드"""
-    with st.spinner("도로 네트워크를 불러오는 중..."):
-        network = RoadNetwork()
-        network.load_from_place(place_name)
-        
-        predictor = TrafficLightPredictor()
-        predictor.auto_detect_traffic_lights(network)
-        
-        pathfinder = AStarPathfinder(network, predictor)
-        
-        st.session_state.road_network = network
-        st.session_state.traffic_predictor = predictor
-        st.session_state.pathfinder = pathfinder
-        
+    future = _network_future(place_name)
+    
+    # 다운로드는 백그라운드 스레드에서 진행하고 경과 시간만 표시
+    status = st.empty()
+    started = time.time()
+    while not future.done():
+        status.text(f"도로 네트워크를 불러오는 중... {time.time() - started:.0f}초")
+        time.sleep(0.5)
+    status.empty()
+    
+    error = future.exception()
+    if error is not None:
+        # 다음 클릭 때 다시 시도하도록 이 지역의 작업만 제거
+        _evict_network_future(place_name, future)
+        if not isinstance(error, NetworkLoadError):
+            st.error(f"도로 네트워크 로드 실패: {error}")
+            return
+    
+    network, predictor, pathfinder = error.fallback if error is not None else future.result()
+    
+    st.session_state.road_network = network
+    st.session_state.traffic_predictor = predictor
+    st.session_state.pathfinder = pathfinder
+    st.session_state.place_name = place_name
+    
+    if error is not None:
+        st.warning(str(error))
+    else:
         st.success("도로 네트워크 로드 완료!")
 
 
+@st.cache_resource
+def _base_map(place_name: str, bounds: Tuple[float, float, float, float]) -> folium.Map:
+    """
+    지역별 기본 지도 (타일과 중심 위치만 포함)
+    지도 요소 ID가 고정되어 재실행 시에도 같은 지도로 인식됨
+    """
+    center_lat = (bounds[0] + bounds[1]) / 2
+    center_lon = (bounds[2] + bounds[3]) / 2
+    
+    return folium.Map(
+        location=[center_lat, center_lon],
+        zoom_start=13,
+        tiles='OpenStreetMap'
+    )
+
+
 def main():
     """메인 애플리케이션"""
     st.title("🚦 신호등 예측 길찾기 시스템")
@@ -116,7 +218,7 @@ def main():
                     st.error("출발지 또는 목적지를 찾을 수 없습니다.")
                 else:
                     with st.spinner("경로를 탐색하는 중..."):
-                        path, cost, stats = st.session_state.pathfinder.find_path(
+                        path, cost, stats = st.session_state.pathfinder.find_path_cached(
                             start_node, end_node, start_time
                         )
                         
@@ -144,16 +246,11 @@ def main():
     else:
         network = st.session_state.road_network
         
-        # 지도 생성
+        # 기본 지도는 캐시에서 복사해 쓰고 경로는 별도 레이어로 그림
+        # (st_folium이 레이어를 지도에 붙이므로 캐시된 원본은 직접 넘기지 않음)
         bounds = network.get_bounds()
-        center_lat = (bounds[0] + bounds[1]) / 2
-        center_lon = (bounds[2] + bounds[3]) / 2
-        
-        m = folium.Map(
-            location=[center_lat, center_lon],
-            zoom_start=13,
-            tiles='OpenStreetMap'
-        )
+        m = copy.deepcopy(_base_map(st.session_state.place_name, bounds))
+        path_layer = folium.FeatureGroup(name="경로")
         
         # 경로 결과가 있는 경우
         if st.session_state.path_result:
@@ -162,11 +259,8 @@ def main():
             stats = result['stats']
             
             # 경로 라인 그리기
-            path_coords = []
-            for node_id in path:
-                node = network.get_node(node_id)
-                if node:
-                    path_coords.append([node.lat, node.lon])
+            path_lat, path_lon = network.get_coords(path)
+            path_coords = np.column_stack((path_lat, path_lon)).tolist()
             
             if len(path_coords) > 1:
                 folium.PolyLine(
@@ -175,7 +269,7 @@ def main():
                     weight=5,
                     opacity=0.7,
                     popup=f"경로 (총 {len(path)}개 노드)"
-                ).add_to(m)
+                ).add_to(path_layer)
             
             # 출발지 마커
             start_node = network.get_node(result['start_node'])
@@ -184,7 +278,7 @@ def main():
                     [start_node.lat, start_node.lon],
                     popup=f"출발지 (노드 {result['start_node']})",
                     icon=folium.Icon(color='green', icon='play')
-                ).add_to(m)
+                ).add_to(path_layer)
             
             # 목적지 마커
             end_node = network.get_node(result['end_node'])
@@ -193,7 +287,7 @@ def main():
                     [end_node.lat, end_node.lon],
                     popup=f"목적지 (노드 {result['end_node']})",
                     icon=folium.Icon(color='red', icon='stop')
-                ).add_to(m)
+                ).add_to(path_layer)
             
             # 통계 정보 표시
             col1, col2, col3, col4 = st.columns(4)
@@ -212,19 +306,16 @@ def main():
             
             # 경로 상세 정보
             with st.expander("경로 상세 정보"):
-                path_df = pd.DataFrame([
-                    {
-                        '순서': i + 1,
-                        '노드 ID': node_id,
-                        '위도': network.get_node(node_id).lat,
-                        '경도': network.get_node(node_id).lon
-                    }
-                    for i, node_id in enumerate(path)
-                ])
+                path_df = pd.DataFrame({
+                    '순서': np.arange(1, len(path) + 1),
+                    '노드 ID': path,
+                    '위도': path_lat,
+                    '경도': path_lon
+                })
                 st.dataframe(path_df, use_container_width=True)
         
         # 지도 표시
-        st_folium(m, width=None, height=600)
+        st_folium(m, feature_group_to_add=path_layer, key="route_map", width=None, height=600)
         
         # 네트워크 정보
         with st.expander("도로 네트워크 정보"):
@@ -2,29 +2,247 @@
 A* 알고리즘을 이용한 경로 탐색 모듈
 신호등 대기 시간을 고려한 최적 경로 탐색
 """
-import heapq
-from typing import List, Tuple, Dict, Optional
-from dataclasses import dataclass
-from road_network import RoadNetwork, Node
+from typing import List, Tuple, Dict
+import functools
+import numpy as np
+import _astar_core
+from road_network import RoadNetwork
 from traffic_light import TrafficLightPredictor
 
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # Numba가 없으면 (PyPy 등) 순수 파이썬 코어로 탐색
+    HAS_NUMBA = False
+    
+    def njit(*args, **kwargs):
+        """Numba가 없을 때 쓰는 대체 데코레이터 (함수를 그대로 반환)"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# 평균 속도 50km/h (m/s), 대기 시간을 거리로 환산할 때 사용
+AVERAGE_SPEED = _astar_core.AVERAGE_SPEED
+# 이동 시간 계산용 역수 (루프 안의 나눗셈을 곱셈으로 대체)
+_INV_AVERAGE_SPEED = _astar_core.INV_AVERAGE_SPEED
+
+# Numba 컴파일 옵션
+# - inf를 g_cost 초기값과 "경로 없음"으로 쓰므로 nnan/ninf를 제외한 fastmath 플래그만 사용
+# - 시그니처를 명시해 타입 추론을 건너뛰고, cache로 재시작 시 컴파일 결과를 디스크에서 로드
+# - nogil로 여러 세션의 경로 탐색이 스레드에서 동시에 실행될 수 있음
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+_JIT_OPTIONS = dict(cache=True, fastmath=_FASTMATH, boundscheck=False, nogil=True)
+
+# 경로 캐시 설정: 출발 시간을 10초 단위로 묶어 같은 구간의 요청은 재사용
+PATH_CACHE_SIZE = 1024
+PATH_CACHE_TIME_BUCKET = 10.0
+
+
+# 힙 위치 배열의 특수 값
+_NOT_IN_HEAP = -1
+_CLOSED = -2
+
+
+@njit('void(float64[::1], int32[::1], int32[::1], int64)', **_JIT_OPTIONS)
+def _sift_up(heap_f, heap_id, pos, i):
+    """i번째 원소를 위로 올리며 힙 속성 복원 (pos 갱신 포함)"""
+    f_cost = heap_f[i]
+    node = heap_id[i]
+    while i > 0:
+        parent = (i - 1) >> 1
+        if heap_f[parent] <= f_cost:
+            break
+        heap_f[i] = heap_f[parent]
+        heap_id[i] = heap_id[parent]
+        pos[heap_id[i]] = i
+        i = parent
+    heap_f[i] = f_cost
+    heap_id[i] = node
+    pos[node] = i
+
+
+@njit('void(float64[::1], int32[::1], int32[::1], int64, int64)', **_JIT_OPTIONS)
+def _sift_down(heap_f, heap_id, pos, i, size):
+    """i번째 원소를 아래로 내리며 힙 속성 복원 (pos 갱신 포함)"""
+    f_cost = heap_f[i]
+    node = heap_id[i]
+    while True:
+        child = 2 * i + 1
+        if child >= size:
+            break
+        if child + 1 < size and heap_f[child + 1] < heap_f[child]:
+            child += 1
+        if f_cost <= heap_f[child]:
+            break
+        heap_f[i] = heap_f[child]
+        heap_id[i] = heap_id[child]
+        pos[heap_id[i]] = i
+        i = child
+    heap_f[i] = f_cost
+    heap_id[i] = node
+    pos[node] = i
+
+
+# 휴리스틱과 대기 시간 규칙은 순수 파이썬 코어와 같은 함수를 컴파일해 사용 (두 경로가 어긋나지 않도록)
+_goal_distance_njit = njit(
+    'float64(float32, float32, float32, float32, float64)', **_JIT_OPTIONS
+)(_astar_core.goal_distance)
+_landmark_bound_njit = njit(
+    'float64(float64[:, ::1], float64[:, ::1], int64, int64, float64)', **_JIT_OPTIONS
+)(_astar_core.landmark_bound)
+_wait_time_njit = njit(
+    'float64(float32, float32, float32, boolean, float64)', **_JIT_OPTIONS
+)(_astar_core.wait_time)
+
+
+@njit('UniTuple(float64, 2)(int64, float64, float32[::1], float32[::1], float32[::1], '
+      'float32[::1], boolean[::1])', **_JIT_OPTIONS)
+def _edge_cost_njit(edge, current_time, lengths, tl_cycle, tl_green, tl_phase0, tl_red_first):
+    """엣지 위치 기준 (거리 + 대기 시간 환산 거리, 대기 시간) 계산"""
+    wait_time = _wait_time_njit(tl_cycle[edge], tl_green[edge], tl_phase0[edge],
+                                tl_red_first[edge], current_time)
+    return lengths[edge] + wait_time * AVERAGE_SPEED, wait_time
+
+
+@njit('Tuple((int32[::1], float64, int64, int64, float64))('
+      'int32[::1], int32[::1], float32[::1], float32[::1], float32[::1], float64, '
+      'float32[::1], float32[::1], float32[::1], boolean[::1], '
+      'float64[:, ::1], float64[:, ::1], int64, int64, float64)',
+      **_JIT_OPTIONS)
+def _astar_njit(indptr, indices, lengths, lat, lon, cos_lat_ref,
+                tl_cycle, tl_green, tl_phase0, tl_red_first, lm_from, lm_to,
+                start, goal, start_time):
+    """
+    CSR 배열 위에서 동작하는 A* 커널
+    휴리스틱은 등장방형 근사 거리와 ALT 랜드마크 하한(lm_from, lm_to의 행) 중 큰 값
+    
+    Returns:
+        (경로 행 번호 배열, 총 비용, 탐색 노드 수, 신호등 수, 총 대기 시간) 튜플
+        경로가 없으면 빈 배열과 inf 반환
+    """
+    n = lat.shape[0]
+    # 노드 행 번호로 색인하는 밀집 배열 (float64로 누적해 긴 경로의 반올림 오차 방지)
+    g_cost = np.full(n, np.inf, dtype=np.float64)
+    parent = np.full(n, -1, dtype=np.int32)
+    
+    # 최적 경로를 따라 각 노드에 도착하는 시간 (신호등 예측에 사용)
+    arrival = np.full(n, np.inf, dtype=np.float64)
+    arrival[start] = start_time
+    
+    # 인덱스 힙: 노드당 최대 한 개의 원소만 두고 pos로 감소 연산 지원
+    heap_f = np.empty(n, dtype=np.float64)
+    heap_id = np.empty(n, dtype=np.int32)
+    pos = np.full(n, _NOT_IN_HEAP, dtype=np.int32)
+    
+    # 목표 좌표와 경도 환산 계수는 루프 밖에서 한 번만 계산
+    goal_lat = lat[goal]
+    goal_lon = lon[goal]
+    lon_scale = 111000.0 * cos_lat_ref
+    
+    g_cost[start] = 0.0
+    h_cost = _goal_distance_njit(lat[start], lon[start], goal_lat, goal_lon, lon_scale)
+    heap_f[0] = _landmark_bound_njit(lm_from, lm_to, start, goal, h_cost)
+    heap_id[0] = start
+    pos[start] = 0
+    size = 1
+    
+    nodes_explored = 0
+    traffic_lights_encountered = 0
+    total_wait_time = 0.0
+    
+    while size > 0:
+        # f_cost가 가장 작은 노드 꺼내기
+        current = heap_id[0]
+        size -= 1
+        if size > 0:
+            heap_f[0] = heap_f[size]
+            heap_id[0] = heap_id[size]
+            _sift_down(heap_f, heap_id, pos, 0, size)
+        pos[current] = _CLOSED
+        
+        if current == goal:
+            length = 1
+            node = goal
+            while parent[node] != -1:
+                node = parent[node]
+                length += 1
+            
+            path = np.empty(length, dtype=np.int32)
+            node = goal
+            for k in range(length - 1, -1, -1):
+                path[k] = node
+                node = parent[node]
+            
+            return (path, g_cost[goal], nodes_explored,
+                    traffic_lights_encountered, total_wait_time)
+        
+        nodes_explored += 1
+        current_time = arrival[current]
+        current_g_cost = g_cost[current]
+        
+        for edge in range(indptr[current], indptr[current + 1]):
+            neighbor = indices[edge]
+            if pos[neighbor] == _CLOSED:
+                continue
+            
+            edge_cost, wait_time = _edge_cost_njit(edge, current_time, lengths,
+                                                   tl_cycle, tl_green, tl_phase0, tl_red_first)
+            
+            if wait_time > 0:
+                traffic_lights_encountered += 1
+                total_wait_time += wait_time
+            
+            tentative_g_cost = current_g_cost + edge_cost
+            
+            if tentative_g_cost < g_cost[neighbor]:
+                g_cost[neighbor] = tentative_g_cost
+                parent[neighbor] = current
+                # 도착 시간 = 현재 노드 도착 시간 + 이동 시간 (대기 시간 포함)
+                arrival[neighbor] = current_time + edge_cost * _INV_AVERAGE_SPEED
+                # 휴리스틱은 더 좋은 경로를 찾은 경우에만 계산
+                h_cost = _goal_distance_njit(lat[neighbor], lon[neighbor],
+                                             goal_lat, goal_lon, lon_scale)
+                h_cost = _landmark_bound_njit(lm_from, lm_to, neighbor, goal, h_cost)
+                f_cost = tentative_g_cost + h_cost
+                
+                if pos[neighbor] >= 0:
+                    # 이미 힙에 있으면 키 감소 후 위로 이동
+                    heap_f[pos[neighbor]] = f_cost
+                    _sift_up(heap_f, heap_id, pos, pos[neighbor])
+                else:
+                    heap_f[size] = f_cost
+                    heap_id[size] = neighbor
+                    _sift_up(heap_f, heap_id, pos, size)
+                    size += 1
+    
+    return (np.empty(0, dtype=np.int32), np.inf, nodes_explored,
+            traffic_lights_encountered, total_wait_time)
+
 
-@dataclass
-class PathNode:
-    """경로 탐색을 위한 노드 클래스"""
-    node_id: int
-    g_cost: float  # 시작점부터 현재 노드까지의 실제 비용
-    h_cost: float  # 현재 노드부터 목표까지의 휴리스틱 비용
-    parent: Optional['PathNode'] = None
+def warmup():
+    """
+    2개 노드 더미 그래프로 Numba 함수를 한 번씩 실행
+    첫 실제 요청 전에 컴파일(또는 캐시 로드)된 코드가 메모리에 올라와 있도록 함
+    """
+    if not HAS_NUMBA:
+        return
     
-    @property
-    def f_cost(self) -> float:
-        """총 비용 (f = g + h)"""
-        return self.g_cost + self.h_cost
+    indptr = np.array([0, 1, 1], dtype=np.int32)
+    indices = np.array([1], dtype=np.int32)
+    lengths = np.ones(1, dtype=np.float32)
+    coords = np.zeros(2, dtype=np.float32)
+    tl_cycle = np.full(1, -1.0, dtype=np.float32)
+    tl_zeros = np.zeros(1, dtype=np.float32)
+    tl_red_first = np.zeros(1, dtype=np.bool_)
+    landmarks = np.array([[0.0], [1.0]], dtype=np.float64)
     
-    def __lt__(self, other):
-        """우선순위 큐를 위한 비교 연산자"""
-        return self.f_cost < other.f_cost
+    _astar_njit(indptr, indices, lengths, coords, coords, 1.0,
+                tl_cycle, tl_zeros, tl_zeros, tl_red_first, landmarks, landmarks, 0, 1, 0.0)
+    _edge_cost_njit(0, 0.0, lengths, tl_cycle, tl_zeros, tl_zeros, tl_red_first)
+
+
+warmup()
 
 
 class AStarPathfinder:
@@ -38,10 +256,59 @@ class AStarPathfinder:
         """
         self.road_network = road_network
         self.traffic_predictor = traffic_predictor
+        
+        # (출발, 목표, 시간 구간) -> 탐색 결과
+        self._cached_search = functools.lru_cache(maxsize=PATH_CACHE_SIZE)(self._search_bucket)
+        
+        self.refresh()
+    
+    def refresh(self):
+        """
+        도로 네트워크와 신호등 정보를 A* 커널용 배열로 다시 변환하고 경로 캐시 초기화
+        네트워크 인덱스나 신호등 버전이 바뀌면 _ensure_current에서 자동으로 호출됨
+        """
+        # A* 커널용 CSR 배열 (인덱스 버전이 바뀌면 _ensure_current에서 다시 호출)
+        (self._indptr, self._indices, self._lengths,
+         self._lat, self._lon, self._row_of) = self.road_network.to_csr()
+        self._index_version = self.road_network.index_version
+        self._node_ids = np.array(list(self._row_of.keys()), dtype=np.int64)
+        (self._tl_cycle, self._tl_green, self._tl_phase0,
+         self._tl_red_first) = self.traffic_predictor.to_edge_arrays(self.road_network)
+        self._traffic_version = self.traffic_predictor.version
+        # boundscheck=False로 컴파일했으므로 길이가 다르면 커널에 넘기기 전에 중단
+        if len(self._tl_cycle) != len(self._indices):
+            raise ValueError(
+                f"신호등 배열 길이({len(self._tl_cycle)})가 엣지 수({len(self._indices)})와 다릅니다"
+            )
+        self._lm_from, self._lm_to = self.road_network.landmark_distances()
+        
+        kernel_args = (
+            self._indptr, self._indices, self._lengths, self._lat, self._lon,
+            self.road_network.cos_lat_ref,
+            self._tl_cycle, self._tl_green, self._tl_phase0, self._tl_red_first,
+            self._lm_from, self._lm_to
+        )
+        if HAS_NUMBA:
+            self._search_kernel = _astar_njit
+            self._kernel_args = kernel_args
+        else:
+            # 순수 파이썬 코어는 NumPy 배열 대신 리스트로 전달
+            self._search_kernel = _astar_core.astar
+            self._kernel_args = tuple(
+                arg.tolist() if isinstance(arg, np.ndarray) else arg for arg in kernel_args
+            )
+        
+        self.clear_path_cache()
+    
+    def _ensure_current(self):
+        """도로 네트워크 인덱스나 신호등 정보가 refresh() 이후 바뀌었으면 커널 배열 갱신"""
+        if (self._index_version != self.road_network.index_version
+                or self._traffic_version != self.traffic_predictor.version):
+            self.refresh()
     
     def heuristic(self, node1_id: int, node2_id: int) -> float:
         """
-        두 노드 간의 휴리스틱 거리 계산 (유클리드 거리)
+        두 노드 간의 휴리스틱 거리 계산 (등장방형 근사 거리와 ALT 랜드마크 하한 중 큰 값)
         
         Args:
             node1_id: 첫 번째 노드 ID
@@ -50,21 +317,17 @@ class AStarPathfinder:
         Returns:
             두 노드 간의 예상 거리
         """
-        node1 = self.road_network.get_node(node1_id)
-        node2 = self.road_network.get_node(node2_id)
+        self._ensure_current()
+        row1 = self._row_of.get(node1_id)
+        row2 = self._row_of.get(node2_id)
         
-        if node1 is None or node2 is None:
+        if row1 is None or row2 is None:
             return float('inf')
         
-        # 유클리드 거리 계산
-        lat_diff = node1.lat - node2.lat
-        lon_diff = node1.lon - node2.lon
-        distance = (lat_diff ** 2 + lon_diff ** 2) ** 0.5
-        
-        # 위도/경도를 대략적인 미터 단위로 변환 (1도 ≈ 111km)
-        return distance * 111000
+        return self.road_network.heuristic_rows(row1, row2)
     
-    def get_edge_cost(self, from_node_id: int, to_node_id: int, current_time: float) -> float:
+    def get_edge_cost(self, from_node_id: int, to_node_id: int,
+                      current_time: float) -> Tuple[float, float]:
         """
         엣지(도로)의 비용 계산 (거리 + 신호등 대기 시간)
         
@@ -74,28 +337,38 @@ class AStarPathfinder:
             current_time: 현재 시간 (초 단위)
             
         Returns:
-            엣지의 총 비용 (미터 단위)
+            (엣지의 총 비용 (미터 단위), 신호등 대기 시간 (초 단위)) 튜플
         """
-        # 기본 거리 비용
-        distance = self.road_network.get_edge_distance(from_node_id, to_node_id)
+        self._ensure_current()
+        edge = self.road_network.edge_index(from_node_id, to_node_id)
         
-        if distance is None:
-            return float('inf')
-        
-        # 신호등이 있는 경우 대기 시간 추가
-        wait_time = self.traffic_predictor.get_wait_time(
-            from_node_id, to_node_id, current_time
-        )
+        if edge is None:
+            return float('inf'), 0.0
         
-        # 대기 시간을 거리로 변환 (평균 속도 50km/h = 13.89m/s 가정)
-        average_speed = 13.89  # m/s
-        wait_distance = wait_time * average_speed
+        return self.edge_cost_fast(edge, current_time)
+    
+    def edge_cost_fast(self, edge: int, current_time: float) -> Tuple[float, float]:
+        """
+        CSR 엣지 위치로 엣지 비용 계산 (dict 조회 없이 배열만 사용)
         
-        return distance + wait_distance
+        Args:
+            edge: RoadNetwork.edge_index()가 반환한 엣지 위치
+            current_time: 현재 시간 (초 단위)
+            
+        Returns:
+            (엣지의 총 비용 (미터 단위), 신호등 대기 시간 (초 단위)) 튜플
+        """
+        self._ensure_current()
+        total_cost, wait_time = _edge_cost_njit(
+            edge, current_time, self._lengths,
+            self._tl_cycle, self._tl_green, self._tl_phase0, self._tl_red_first
+        )
+        return float(total_cost), float(wait_time)
     
     def find_path(self, start_id: int, goal_id: int, start_time: float = 0.0) -> Tuple[List[int], float, Dict]:
         """
         A* 알고리즘을 이용한 최적 경로 탐색
+        호출 시점의 도로 네트워크와 신호등 상태를 사용 (refresh()를 따로 호출할 필요 없음)
         
         Args:
             start_id: 시작 노드 ID
@@ -112,95 +385,57 @@ class AStarPathfinder:
         if not self.road_network.has_node(start_id) or not self.road_network.has_node(goal_id):
             return [], float('inf'), {}
         
-        # 오픈 리스트 (우선순위 큐)
-        open_list = []
-        heapq.heappush(open_list, PathNode(
-            node_id=start_id,
-            g_cost=0.0,
-            h_cost=self.heuristic(start_id, goal_id)
-        ))
-        
-        # 닫힌 리스트 (이미 탐색한 노드)
-        closed_set = set()
-        
-        # 각 노드까지의 최소 비용 추적
-        g_costs = {start_id: 0.0}
-        parents = {}
+        # 생성 이후 신호등이나 네트워크가 바뀌었으면 커널 배열부터 갱신 (항상 현재 상태로 탐색)
+        self._ensure_current()
+        path_rows, cost, nodes_explored, lights, wait = self._search_kernel(
+            *self._kernel_args,
+            self._row_of[start_id], self._row_of[goal_id], float(start_time)
+        )
         
         # 통계 정보
         stats = {
-            'nodes_explored': 0,
-            'traffic_lights_encountered': 0,
-            'total_wait_time': 0.0
+            'nodes_explored': int(nodes_explored),
+            'traffic_lights_encountered': int(lights),
+            'total_wait_time': float(wait)
         }
         
-        current_time = start_time
+        # 경로를 찾지 못한 경우
+        if len(path_rows) == 0:
+            return [], float('inf'), stats
         
-        while open_list:
-            # f_cost가 가장 작은 노드 선택
-            current = heapq.heappop(open_list)
-            
-            # 목표 노드에 도달한 경우
-            if current.node_id == goal_id:
-                # 경로 재구성
-                path = []
-                node_id = goal_id
-                while node_id is not None:
-                    path.append(node_id)
-                    node_id = parents.get(node_id)
-                path.reverse()
-                
-                return path, current.g_cost, stats
-            
-            # 이미 더 좋은 경로로 탐색한 노드는 스킵
-            if current.node_id in closed_set:
-                continue
-            
-            closed_set.add(current.node_id)
-            stats['nodes_explored'] += 1
-            
-            # 인접 노드 탐색
-            neighbors = self.road_network.get_neighbors(current.node_id)
+        path = self._node_ids[path_rows].tolist()
+        return path, float(cost), stats
+    
+    def find_path_cached(self, start_id: int, goal_id: int,
+                         start_time: float = 0.0) -> Tuple[List[int], float, Dict]:
+        """
+        캐시를 이용한 경로 탐색
+        
+        출발 시간을 PATH_CACHE_TIME_BUCKET 초 단위로 내림하여 탐색하므로
+        같은 구간 안의 반복 요청은 A* 탐색 없이 바로 반환됨
+        네트워크나 신호등이 바뀌면 캐시를 비우고 다시 탐색
+        
+        Args:
+            start_id: 시작 노드 ID
+            goal_id: 목표 노드 ID
+            start_time: 시작 시간 (초 단위)
             
-            for neighbor_id in neighbors:
-                if neighbor_id in closed_set:
-                    continue
-                
-                # 엣지 비용 계산
-                edge_cost = self.get_edge_cost(current.node_id, neighbor_id, current_time)
-                
-                if edge_cost == float('inf'):
-                    continue
-                
-                # 신호등 대기 시간 확인
-                wait_time = self.traffic_predictor.get_wait_time(
-                    current.node_id, neighbor_id, current_time
-                )
-                if wait_time > 0:
-                    stats['traffic_lights_encountered'] += 1
-                    stats['total_wait_time'] += wait_time
-                
-                # 새로운 g_cost 계산
-                tentative_g_cost = g_costs[current.node_id] + edge_cost
-                
-                # 더 좋은 경로를 찾은 경우
-                if neighbor_id not in g_costs or tentative_g_cost < g_costs[neighbor_id]:
-                    g_costs[neighbor_id] = tentative_g_cost
-                    parents[neighbor_id] = current.node_id
-                    
-                    h_cost = self.heuristic(neighbor_id, goal_id)
-                    
-                    heapq.heappush(open_list, PathNode(
-                        node_id=neighbor_id,
-                        g_cost=tentative_g_cost,
-                        h_cost=h_cost,
-                        parent=current
-                    ))
-                
-                # 시간 업데이트 (이동 시간 + 대기 시간)
-                travel_time = edge_cost / 13.89  # 평균 속도로 나눔
-                current_time += travel_time
+        Returns:
+            (경로 노드 ID 리스트, 총 비용, 통계 정보) 튜플
+        """
+        # 네트워크나 신호등이 바뀌었으면 refresh()가 캐시도 비우므로 조회 전에 확인
+        self._ensure_current()
+        bucket = int(start_time // PATH_CACHE_TIME_BUCKET)
+        path, cost, stats = self._cached_search(start_id, goal_id, bucket)
         
-        # 경로를 찾지 못한 경우
-        return [], float('inf'), stats
-
+        # 캐시된 결과가 호출자에 의해 바뀌지 않도록 복사본 반환
+        return list(path), cost, dict(stats)
+    
+    def clear_path_cache(self):
+        """경로 캐시 초기화"""
+        self._cached_search.cache_clear()
+    
+    def _search_bucket(self, start_id: int, goal_id: int, bucket: int) -> Tuple[Tuple[int, ...], float, Dict]:
+        """시간 구간의 시작 시각으로 경로 탐색 (find_path_cached의 캐시 대상)"""
+        path, cost, stats = self.find_path(start_id, goal_id, bucket * PATH_CACHE_TIME_BUCKET)
+        return tuple(path), cost, stats
@@ -4,9 +4,42 @@ OpenStreetMap 데이터를 이용한 도로 네트워크 구축
 """
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+import math
+import numpy as np
 import osmnx as ox
 import networkx as nx
-from geopy.distance import geodesic
+import _astar_core
+
+try:
+    from sklearn.neighbors import BallTree
+except ImportError:  # scikit-learn이 없으면 NumPy 전체 탐색으로 대체
+    BallTree = None
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+except ImportError:  # SciPy가 없으면 랜드마크 없이 등장방형 근사 휴리스틱만 사용
+    dijkstra = None
+
+
+def _haversine_np(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    하버사인 공식으로 두 좌표 배열 간의 거리 계산 (벡터 연산)
+    
+    Args:
+        lat1, lon1: 시작 좌표 배열 (도 단위)
+        lat2, lon2: 끝 좌표 배열 (도 단위)
+        
+    Returns:
+        거리 배열 (미터 단위)
+    """
+    R = 6371000  # 지구 반지름 (미터)
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lat2 = np.asarray(lat2, dtype=np.float64)
+    dlat = np.deg2rad(lat2 - lat1)
+    dlon = np.deg2rad(np.asarray(lon2, dtype=np.float64) - np.asarray(lon1, dtype=np.float64))
+    a = np.sin(dlat / 2) ** 2 + np.cos(np.deg2rad(lat1)) * np.cos(np.deg2rad(lat2)) * np.sin(dlon / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(a))
 
 
 @dataclass
@@ -18,14 +51,76 @@ class Node:
     name: Optional[str] = None
 
 
+class VersionedDict(dict):
+    """값을 바꾸는 연산마다 version이 증가하는 dict (인덱스 갱신 여부 판단용)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+    
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+    
+    def __ior__(self, other):
+        self.update(other)
+        return self
+    
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+    
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.version += 1
+        return super().setdefault(key, default)
+    
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+    
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+    
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+
 class RoadNetwork:
     """도로 네트워크 클래스"""
     
     def __init__(self):
         """도로 네트워크 초기화"""
         self.graph: Optional[nx.MultiDiGraph] = None
-        self.nodes: Dict[int, Node] = {}
-        self.edges: Dict[Tuple[int, int], float] = {}  # (from, to) -> distance
+        # 값이 바뀌면 version이 증가하므로 다음 조회 때 인덱스를 다시 생성
+        self.nodes: Dict[int, Node] = VersionedDict()
+        self.edges: Dict[Tuple[int, int], float] = VersionedDict()  # (from, to) -> distance
+        
+        # 노드 좌표의 배열 표현과 공간 인덱스 (_build_index에서 생성)
+        self._node_ids: np.ndarray = np.empty(0, dtype=np.int64)
+        self._idx_of: Dict[int, int] = {}  # 노드 ID -> 행 번호
+        self._lat: np.ndarray = np.empty(0, dtype=np.float64)
+        self._lon: np.ndarray = np.empty(0, dtype=np.float64)
+        self._coords: np.ndarray = np.empty((0, 2), dtype=np.float64)  # (lat, lon) 라디안
+        self._cos_lat_ref: float = 1.0  # 평균 위도의 cos 값 (경도 거리 보정)
+        self._indptr: np.ndarray = np.zeros(1, dtype=np.int32)
+        self._indices: np.ndarray = np.empty(0, dtype=np.int32)
+        self._lengths: np.ndarray = np.empty(0, dtype=np.float32)
+        self._edge_index: Dict[Tuple[int, int], int] = {}  # (from, to) -> CSR 엣지 위치
+        self._index_key: Tuple[int, int] = (0, 0)  # 인덱스 생성 시점의 (노드 version, 엣지 version)
+        self._index_version: int = 0  # 인덱스를 생성할 때마다 증가 (엣지 위치가 바뀌었는지 판단)
+        self._tree = None
+        
+        # ALT 랜드마크 거리 (행 번호 x 랜드마크, 랜드마크가 없으면 열이 0개)
+        self._landmarks: np.ndarray = np.empty(0, dtype=np.int64)
+        self._lm_from: np.ndarray = np.empty((0, 0), dtype=np.float64)  # 랜드마크 -> 노드
+        self._lm_to: np.ndarray = np.empty((0, 0), dtype=np.float64)  # 노드 -> 랜드마크
     
     def load_from_place(self, place_name: str, network_type: str = 'drive'):
         """
@@ -39,38 +134,14 @@ class RoadNetwork:
             # OSMnx를 사용하여 도로 네트워크 다운로드
             self.graph = ox.graph_from_place(place_name, network_type=network_type)
             
-            # 노드 정보 추출
-            for node_id, data in self.graph.nodes(data=True):
-                self.nodes[node_id] = Node(
-                    node_id=node_id,
-                    lat=data.get('y', 0),
-                    lon=data.get('x', 0),
-                    name=data.get('name', None)
-                )
-            
-            # 엣지 정보 추출 (거리 계산)
-            for u, v, data in self.graph.edges(data=True):
-                if 'length' in data:
-                    distance = data['length']  # 미터 단위
-                else:
-                    # 거리 정보가 없으면 좌표로 계산
-                    node_u = self.nodes.get(u)
-                    node_v = self.nodes.get(v)
-                    if node_u and node_v:
-                        distance = geodesic(
-                            (node_u.lat, node_u.lon),
-                            (node_v.lat, node_v.lon)
-                        ).meters
-                    else:
-                        distance = 0
-                
-                self.edges[(u, v)] = distance
-            
+            self._extract_graph()
+            self._build_index()
             print(f"도로 네트워크 로드 완료: {len(self.nodes)}개 노드, {len(self.edges)}개 엣지")
             
         except Exception as e:
             print(f"도로 네트워크 로드 실패: {e}")
-            # 실패 시 더미 데이터 생성
+            # 실패 시 더미 데이터 생성 (graph가 None이면 더미 네트워크임을 나타냄)
+            self.graph = None
             self._create_dummy_network()
     
     def load_from_bbox(self, north: float, south: float, east: float, west: float,
@@ -88,38 +159,48 @@ class RoadNetwork:
         try:
             self.graph = ox.graph_from_bbox(north, south, east, west, network_type=network_type)
             
-            # 노드 정보 추출
-            for node_id, data in self.graph.nodes(data=True):
-                self.nodes[node_id] = Node(
-                    node_id=node_id,
-                    lat=data.get('y', 0),
-                    lon=data.get('x', 0),
-                    name=data.get('name', None)
-                )
-            
-            # 엣지 정보 추출
-            for u, v, data in self.graph.edges(data=True):
-                if 'length' in data:
-                    distance = data['length']
-                else:
-                    node_u = self.nodes.get(u)
-                    node_v = self.nodes.get(v)
-                    if node_u and node_v:
-                        distance = geodesic(
-                            (node_u.lat, node_u.lon),
-                            (node_v.lat, node_v.lon)
-                        ).meters
-                    else:
-                        distance = 0
-                
-                self.edges[(u, v)] = distance
-            
+            self._extract_graph()
+            self._build_index()
             print(f"도로 네트워크 로드 완료: {len(self.nodes)}개 노드, {len(self.edges)}개 엣지")
             
         except Exception as e:
             print(f"도로 네트워크 로드 실패: {e}")
+            self.graph = None
             self._create_dummy_network()
     
+    def _extract_graph(self):
+        """로드한 OSMnx 그래프에서 노드와 엣지(거리) 정보 추출"""
+        # 노드 정보 추출
+        for node_id, data in self.graph.nodes(data=True):
+            self.nodes[node_id] = Node(
+                node_id=node_id,
+                lat=data.get('y', 0),
+                lon=data.get('x', 0),
+                name=data.get('name', None)
+            )
+        
+        # 엣지 정보 추출 (그래프 순서대로, 거리 정보가 없으면 NaN으로 표시)
+        keys, distances = [], []
+        for u, v, data in self.graph.edges(data=True):
+            keys.append((u, v))
+            distances.append(data.get('length', np.nan))  # 미터 단위
+        distances = np.array(distances, dtype=np.float64)
+        
+        # 거리 정보가 없는 엣지는 좌표로 한 번에 계산 (노드가 없으면 0)
+        missing = [k for k in np.flatnonzero(np.isnan(distances))
+                   if keys[k][0] in self.nodes and keys[k][1] in self.nodes]
+        distances[np.isnan(distances)] = 0
+        if missing:
+            node_u = [self.nodes[keys[k][0]] for k in missing]
+            node_v = [self.nodes[keys[k][1]] for k in missing]
+            distances[missing] = _haversine_np(
+                [node.lat for node in node_u], [node.lon for node in node_u],
+                [node.lat for node in node_v], [node.lon for node in node_v]
+            )
+        
+        for key, distance in zip(keys, distances.tolist()):
+            self.edges[key] = distance
+    
     def _create_dummy_network(self):
         """테스트용 더미 네트워크 생성"""
         print("더미 네트워크 생성 중...")
@@ -137,31 +218,125 @@ class RoadNetwork:
                 node_id += 1
         
         # 엣지 생성 (상하좌우 연결)
+        from_ids, to_ids = [], []
         for i in range(10):
             for j in range(10):
                 current_id = i * 10 + j
                 # 오른쪽 연결
                 if j < 9:
-                    right_id = i * 10 + (j + 1)
-                    distance = geodesic(
-                        (self.nodes[current_id].lat, self.nodes[current_id].lon),
-                        (self.nodes[right_id].lat, self.nodes[right_id].lon)
-                    ).meters
-                    self.edges[(current_id, right_id)] = distance
-                    self.edges[(right_id, current_id)] = distance
+                    from_ids.append(current_id)
+                    to_ids.append(i * 10 + (j + 1))
                 
                 # 아래쪽 연결
                 if i < 9:
-                    down_id = (i + 1) * 10 + j
-                    distance = geodesic(
-                        (self.nodes[current_id].lat, self.nodes[current_id].lon),
-                        (self.nodes[down_id].lat, self.nodes[down_id].lon)
-                    ).meters
-                    self.edges[(current_id, down_id)] = distance
-                    self.edges[(down_id, current_id)] = distance
+                    from_ids.append(current_id)
+                    to_ids.append((i + 1) * 10 + j)
+        
+        # 모든 엣지 거리를 한 번에 계산
+        lat = np.array([self.nodes[k].lat for k in range(node_id)])
+        lon = np.array([self.nodes[k].lon for k in range(node_id)])
+        distances = _haversine_np(lat[from_ids], lon[from_ids], lat[to_ids], lon[to_ids])
+        
+        for from_id, to_id, distance in zip(from_ids, to_ids, distances.tolist()):
+            self.edges[(from_id, to_id)] = distance
+            self.edges[(to_id, from_id)] = distance
         
+        self._build_index()
         print(f"더미 네트워크 생성 완료: {len(self.nodes)}개 노드, {len(self.edges)}개 엣지")
     
+    def _build_index(self):
+        """노드 좌표 배열, 최근접 노드 탐색용 BallTree, CSR 인접 배열, ALT 랜드마크 거리 생성"""
+        n = len(self.nodes)
+        self._node_ids = np.fromiter(self.nodes.keys(), dtype=np.int64, count=n)
+        self._idx_of = {node_id: row for row, node_id in enumerate(self.nodes.keys())}
+        self._lat = np.fromiter((node.lat for node in self.nodes.values()), dtype=np.float64, count=n)
+        self._lon = np.fromiter((node.lon for node in self.nodes.values()), dtype=np.float64, count=n)
+        self._coords = np.deg2rad(np.column_stack((self._lat, self._lon)))
+        
+        # 도시 규모에서는 위도 변화가 작으므로 평균 위도 하나로 경도 거리 보정
+        self._cos_lat_ref = math.cos(math.radians(float(self._lat.mean()))) if n > 0 else 1.0
+        
+        if BallTree is not None and len(self._node_ids) > 0:
+            self._tree = BallTree(self._coords, metric='haversine')
+        else:
+            self._tree = None
+        
+        # 양 끝 노드가 모두 존재하는 엣지만 사용
+        keys, src, dst, lengths = [], [], [], []
+        for (from_id, to_id), distance in self.edges.items():
+            if from_id in self._idx_of and to_id in self._idx_of:
+                keys.append((from_id, to_id))
+                src.append(self._idx_of[from_id])
+                dst.append(self._idx_of[to_id])
+                lengths.append(distance)
+        
+        src = np.array(src, dtype=np.int32)
+        # 출발 행 기준으로 정렬 (같은 행 안에서는 입력 순서 유지)
+        order = np.argsort(src, kind='stable')
+        self._indices = np.array(dst, dtype=np.int32)[order]
+        self._lengths = np.array(lengths, dtype=np.float32)[order]
+        
+        self._indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=n), out=self._indptr[1:])
+        
+        # (출발, 도착) -> CSR 엣지 위치
+        edge_pos = np.empty(len(order), dtype=np.int64)
+        edge_pos[order] = np.arange(len(order))
+        self._edge_index = dict(zip(keys, edge_pos.tolist()))
+        
+        self._build_landmarks()
+        
+        self._index_key = (self.nodes.version, self.edges.version)
+        self._index_version += 1
+    
+    def _build_landmarks(self):
+        """
+        경계 상자 네 모서리에 가장 가까운 노드를 랜드마크로 골라 최단 거리 계산
+        
+        도로 그래프는 방향 그래프이므로 랜드마크에서 나가는 거리와
+        랜드마크로 들어오는 거리(역방향 그래프)를 각각 Dijkstra로 계산
+        """
+        n = len(self._node_ids)
+        if dijkstra is None or n == 0:
+            self._landmarks = np.empty(0, dtype=np.int64)
+            self._lm_from = np.empty((n, 0), dtype=np.float64)
+            self._lm_to = np.empty((n, 0), dtype=np.float64)
+            return
+        
+        min_lat, max_lat = self._lat.min(), self._lat.max()
+        min_lon, max_lon = self._lon.min(), self._lon.max()
+        corners = [(min_lat, min_lon), (min_lat, max_lon), (max_lat, min_lon), (max_lat, max_lon)]
+        # 작은 네트워크에서는 여러 모서리가 같은 노드를 가리킬 수 있으므로 중복 제거
+        rows = dict.fromkeys(self._nearest_row(lat, lon) for lat, lon in corners)
+        self._landmarks = np.array(list(rows), dtype=np.int64)
+        
+        graph = csr_matrix((self._lengths.astype(np.float64), self._indices, self._indptr), shape=(n, n))
+        # 결과는 (랜드마크, 노드) 형태이므로 노드별로 연속되도록 전치
+        self._lm_from = np.ascontiguousarray(
+            dijkstra(graph, directed=True, indices=self._landmarks).T)
+        self._lm_to = np.ascontiguousarray(
+            dijkstra(graph.T.tocsr(), directed=True, indices=self._landmarks).T)
+    
+    def _ensure_index(self):
+        """노드/엣지가 인덱스 생성 이후 바뀌었으면 다시 생성 (개수가 같아도 값이 바뀌면 감지)"""
+        if self._index_key != (self.nodes.version, self.edges.version):
+            self._build_index()
+    
+    @property
+    def index_version(self) -> int:
+        """
+        CSR 인덱스 버전 (인덱스를 다시 생성할 때마다 증가)
+        
+        to_csr()나 edge_index()로 얻은 엣지 위치는 같은 버전에서만 유효함
+        """
+        self._ensure_index()
+        return self._index_version
+    
+    @property
+    def cos_lat_ref(self) -> float:
+        """경도 1도를 위도 1도 대비 거리로 환산하는 계수 (평균 위도의 cos 값)"""
+        return self._cos_lat_ref
+    
     def get_node(self, node_id: int) -> Optional[Node]:
         """노드 정보 가져오기"""
         return self.nodes.get(node_id)
@@ -172,20 +347,40 @@ class RoadNetwork:
     
     def get_neighbors(self, node_id: int) -> List[int]:
         """노드의 인접 노드 리스트 반환"""
-        if self.graph is not None:
-            return list(self.graph.neighbors(node_id))
-        else:
-            # 더미 네트워크의 경우
-            neighbors = []
-            for (from_id, to_id) in self.edges.keys():
-                if from_id == node_id:
-                    neighbors.append(to_id)
-            return neighbors
+        self._ensure_index()
+        
+        row = self._idx_of.get(node_id)
+        if row is None:
+            return []
+        
+        # CSR 구간 슬라이스로 출발 엣지의 도착 노드 조회
+        rows = self._indices[self._indptr[row]:self._indptr[row + 1]]
+        return self._node_ids[rows].tolist()
     
     def get_edge_distance(self, from_node_id: int, to_node_id: int) -> Optional[float]:
         """엣지의 거리 반환"""
         return self.edges.get((from_node_id, to_node_id))
     
+    def get_coords(self, node_ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        여러 노드의 좌표를 배열로 반환
+        
+        Args:
+            node_ids: 노드 ID 리스트 (모두 네트워크에 존재해야 함)
+            
+        Returns:
+            (위도 배열, 경도 배열) 튜플
+        """
+        self._ensure_index()
+        rows = np.fromiter((self._idx_of[node_id] for node_id in node_ids),
+                           dtype=np.int64, count=len(node_ids))
+        return self._lat[rows], self._lon[rows]
+    
+    def edge_index(self, from_node_id: int, to_node_id: int) -> Optional[int]:
+        """엣지의 CSR 배열 위치 반환 (to_csr()의 indices/lengths 기준)"""
+        self._ensure_index()
+        return self._edge_index.get((from_node_id, to_node_id))
+    
     def find_nearest_node(self, lat: float, lon: float) -> Optional[int]:
         """
         주어진 좌표에 가장 가까운 노드 찾기
@@ -200,16 +395,70 @@ class RoadNetwork:
         if not self.nodes:
             return None
         
-        min_distance = float('inf')
-        nearest_node_id = None
+        self._ensure_index()
         
-        for node_id, node in self.nodes.items():
-            distance = geodesic((lat, lon), (node.lat, node.lon)).meters
-            if distance < min_distance:
-                min_distance = distance
-                nearest_node_id = node_id
+        return int(self._node_ids[self._nearest_row(lat, lon)])
+    
+    def _nearest_row(self, lat: float, lon: float) -> int:
+        """주어진 좌표에 가장 가까운 노드의 행 번호 (인덱스가 최신이라고 가정)"""
+        if self._tree is not None:
+            return int(self._tree.query(np.deg2rad([[lat, lon]]), k=1, return_distance=False)[0, 0])
+        
+        # BallTree를 쓸 수 없으면 등장방형 근사 거리로 한 번에 계산
+        d = (self._lat - lat) ** 2 + (np.cos(np.deg2rad(lat)) * (self._lon - lon)) ** 2
+        return int(d.argmin())
+    
+    def heuristic_rows(self, i: int, j: int) -> float:
+        """
+        행 번호로 지정한 두 노드 간의 휴리스틱 거리
+        등장방형 근사 거리와 ALT 랜드마크 하한 중 큰 값
+        
+        Args:
+            i: 첫 번째 노드의 행 번호
+            j: 두 번째 노드의 행 번호
+            
+        Returns:
+            두 노드 간의 예상 거리 (미터)
+        """
+        # 위도/경도를 대략적인 미터 단위로 변환 (1도 ≈ 111km, 경도는 cos(위도) 보정)
+        h = _astar_core.goal_distance(self._lat[i], self._lon[i], self._lat[j], self._lon[j],
+                                      111000.0 * self._cos_lat_ref)
+        
+        return float(_astar_core.landmark_bound(self._lm_from, self._lm_to, i, j, h))
+    
+    def to_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[int, int]]:
+        """
+        도로 네트워크를 CSR(Compressed Sparse Row) 인접 배열로 변환
+        
+        노드는 0부터 시작하는 행 번호로 재색인되며, 각 행의 엣지는
+        indices[indptr[row]:indptr[row + 1]] 구간에 연속으로 저장됨
+        
+        Returns:
+            (indptr, indices, lengths, node_lat, node_lon, row_of) 튜플
+            - indptr: int32[n + 1] 행별 엣지 시작 위치
+            - indices: int32[nnz] 도착 노드의 행 번호
+            - lengths: float32[nnz] 엣지 거리 (미터)
+            - node_lat, node_lon: float32[n] 노드 좌표
+            - row_of: 노드 ID -> 행 번호 매핑
+        """
+        self._ensure_index()
+        
+        return (self._indptr, self._indices, self._lengths,
+                self._lat.astype(np.float32), self._lon.astype(np.float32), self._idx_of)
+    
+    def landmark_distances(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        ALT 휴리스틱용 랜드마크 최단 거리 배열 반환 (행 번호는 to_csr() 기준)
+        
+        Returns:
+            (lm_from, lm_to) 튜플
+            - lm_from: float64[n, k] 랜드마크에서 각 노드까지의 거리 (미터)
+            - lm_to: float64[n, k] 각 노드에서 랜드마크까지의 거리 (미터)
+            - 도달할 수 없으면 inf, SciPy가 없으면 k = 0
+        """
+        self._ensure_index()
         
-        return nearest_node_id
+        return self._lm_from, self._lm_to
     
     def get_bounds(self) -> Tuple[float, float, float, float]:
         """
@@ -221,8 +470,8 @@ class RoadNetwork:
         if not self.nodes:
             return (0, 0, 0, 0)
         
-        lats = [node.lat for node in self.nodes.values()]
-        lons = [node.lon for node in self.nodes.values()]
+        self._ensure_index()
         
-        return (min(lats), max(lats), min(lons), max(lons))
+        return (float(self._lat.min()), float(self._lat.max()),
+                float(self._lon.min()), float(self._lon.max()))
 
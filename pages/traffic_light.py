@@ -5,6 +5,15 @@ from typing import Dict, Tuple, Optional
 import random
 import math
 from dataclasses import dataclass
+import numpy as np
+from road_network import VersionedDict
+
+
+def _edge_node_ids(road_network) -> Tuple[np.ndarray, np.ndarray]:
+    """현재 CSR 엣지 위치별 (출발 노드 ID 배열, 도착 노드 ID 배열) 반환"""
+    indptr, indices, *_, row_of = road_network.to_csr()
+    node_ids = np.fromiter(row_of.keys(), dtype=np.int64, count=len(row_of))
+    return np.repeat(node_ids, np.diff(indptr)), node_ids[indices]
 
 
 @dataclass
@@ -21,9 +30,29 @@ class TrafficLight:
 class TrafficLightPredictor:
     """신호등 잔여시간 예측 클래스"""
     
-    def __init__(self):
-        """신호등 데이터 초기화"""
-        self.traffic_lights: Dict[Tuple[int, int], TrafficLight] = {}
+    def __init__(self, seed: Optional[int] = None):
+        """
+        신호등 데이터 초기화
+        
+        Args:
+            seed: 자동 배치 신호등의 난수 시드 (None이면 매번 다름)
+        """
+        # 신호등을 추가하거나 바꾸면 version이 증가하므로 경로 탐색기가 다음 호출 때 배열을 갱신
+        self.traffic_lights: Dict[Tuple[int, int], TrafficLight] = VersionedDict()
+        self._rng = np.random.default_rng(seed)
+        
+        # auto_detect_traffic_lights로 일괄 배치한 신호등 (CSR 엣지 위치 기준 배열)
+        # 네트워크 인덱스가 다시 생성되면 _sync_bulk에서 (출발, 도착) 노드 ID로 새 위치에 옮김
+        self._bulk_network = None
+        self._bulk_version: int = -1  # 배열 생성 시점의 road_network.index_version
+        self._bulk_from: np.ndarray = np.empty(0, dtype=np.int64)  # 엣지 위치별 출발 노드 ID
+        self._bulk_to: np.ndarray = np.empty(0, dtype=np.int64)  # 엣지 위치별 도착 노드 ID
+        self._bulk_generation: int = 0  # auto_detect_traffic_lights 호출마다 증가
+        self._bulk_cycle: np.ndarray = np.empty(0, dtype=np.float32)  # 신호등이 없으면 -1
+        self._bulk_green: np.ndarray = np.empty(0, dtype=np.float32)
+        self._bulk_phase_start: np.ndarray = np.empty(0, dtype=np.float32)
+        self._bulk_red_first: np.ndarray = np.empty(0, dtype=np.bool_)
+        
         self._initialize_default_traffic_lights()
     
     def _initialize_default_traffic_lights(self):
@@ -35,6 +64,14 @@ class TrafficLightPredictor:
         # 실제 구현에서는 도로 네트워크의 교차로를 분석하여 자동으로 설정
         pass
     
+    @property
+    def version(self) -> Tuple[int, int]:
+        """
+        신호등 정보 버전 (직접 추가한 신호등 dict의 version, 일괄 배치 횟수)
+        값이 바뀌었으면 to_edge_arrays()로 만든 배열이 오래된 것임
+        """
+        return self.traffic_lights.version, self._bulk_generation
+    
     def add_traffic_light(self, from_node: int, to_node: int, 
                          cycle_time: float = 120.0, 
                          green_ratio: float = 0.5):
@@ -63,6 +100,39 @@ class TrafficLightPredictor:
             phase_start_time=phase_start_time
         )
     
+    def get_traffic_light(self, from_node: int, to_node: int) -> Optional[TrafficLight]:
+        """
+        엣지에 설치된 신호등 정보 반환
+        
+        직접 추가한 신호등을 우선하며, 일괄 배치한 신호등은 배열 값으로 만든 객체를 반환
+        
+        Args:
+            from_node: 출발 노드 ID
+            to_node: 도착 노드 ID
+            
+        Returns:
+            신호등 정보, 신호등이 없으면 None
+        """
+        traffic_light = self.traffic_lights.get((from_node, to_node))
+        if traffic_light is not None or self._bulk_network is None:
+            return traffic_light
+        
+        self._sync_bulk()
+        edge = self._bulk_network.edge_index(from_node, to_node)
+        if edge is None or self._bulk_cycle[edge] <= 0:
+            return None
+        
+        cycle_time = float(self._bulk_cycle[edge])
+        green_time = float(self._bulk_green[edge])
+        return TrafficLight(
+            node_id=from_node,
+            cycle_time=cycle_time,
+            green_time=green_time,
+            red_time=cycle_time - green_time,
+            current_phase='red' if self._bulk_red_first[edge] else 'green',
+            phase_start_time=float(self._bulk_phase_start[edge])
+        )
+    
     def get_wait_time(self, from_node: int, to_node: int, current_time: float) -> float:
         """
         특정 시간에 신호등에서 대기해야 하는 시간 계산
@@ -75,13 +145,11 @@ class TrafficLightPredictor:
         Returns:
             대기 시간 (초 단위), 신호등이 없으면 0
         """
-        key = (from_node, to_node)
+        traffic_light = self.get_traffic_light(from_node, to_node)
         
-        if key not in self.traffic_lights:
+        if traffic_light is None:
             return 0.0
         
-        traffic_light = self.traffic_lights[key]
-        
         # 사이클 내에서의 상대 시간 계산
         cycle_position = (current_time - traffic_light.phase_start_time) % traffic_light.cycle_time
         
@@ -122,12 +190,11 @@ class TrafficLightPredictor:
         Returns:
             (신호 상태, 잔여 시간) 튜플
         """
-        key = (from_node, to_node)
+        traffic_light = self.get_traffic_light(from_node, to_node)
         
-        if key not in self.traffic_lights:
+        if traffic_light is None:
             return 'none', 0.0
         
-        traffic_light = self.traffic_lights[key]
         cycle_position = (current_time - traffic_light.phase_start_time) % traffic_light.cycle_time
         
         if cycle_position < traffic_light.green_time:
@@ -142,21 +209,108 @@ class TrafficLightPredictor:
         도로 네트워크를 분석하여 교차로에 신호등 자동 배치
         실제 구현에서는 교차로의 연결 수 등을 기반으로 판단
         """
-        # 교차로 노드 찾기 (2개 이상의 엣지를 가진 노드)
-        intersection_nodes = []
-        for node_id in road_network.nodes:
-            neighbors = road_network.get_neighbors(node_id)
-            if len(neighbors) >= 2:
-                intersection_nodes.append(node_id)
-        
-        # 교차로에 신호등 추가
-        for node_id in intersection_nodes:
-            neighbors = road_network.get_neighbors(node_id)
-            for neighbor_id in neighbors:
-                # 양방향 엣지에 대해 한 번만 추가
-                if (node_id, neighbor_id) not in self.traffic_lights:
-                    # 주기와 녹색 비율을 랜덤하게 설정 (실제로는 데이터 기반)
-                    cycle_time = random.uniform(90, 150)  # 90~150초
-                    green_ratio = random.uniform(0.4, 0.6)  # 40~60%
-                    self.add_traffic_light(node_id, neighbor_id, cycle_time, green_ratio)
-
+        indptr, indices, *_ = road_network.to_csr()
+        nnz = len(indices)
+        
+        # 교차로 노드 찾기 (2개 이상의 엣지를 가진 노드)의 출발 엣지를 한 번에 선택
+        degree = np.diff(indptr)
+        edge_degree = np.repeat(degree, degree)
+        candidates = edge_degree >= 2
+        
+        if self._bulk_network is road_network:
+            # 이미 배치된 신호등은 유지
+            self._sync_bulk()
+            candidates &= self._bulk_cycle <= 0
+        else:
+            self._bulk_network = road_network
+            self._bulk_version = road_network.index_version
+            self._bulk_from, self._bulk_to = _edge_node_ids(road_network)
+            self._bulk_cycle = np.full(nnz, -1.0, dtype=np.float32)
+            self._bulk_green = np.zeros(nnz, dtype=np.float32)
+            self._bulk_phase_start = np.zeros(nnz, dtype=np.float32)
+            self._bulk_red_first = np.zeros(nnz, dtype=np.bool_)
+        
+        # 주기와 녹색 비율을 랜덤하게 설정 (실제로는 데이터 기반)
+        count = int(candidates.sum())
+        cycle_time = self._rng.uniform(90, 150, count)  # 90~150초
+        green_ratio = self._rng.uniform(0.4, 0.6, count)  # 40~60%
+        
+        # add_traffic_light와 같은 방식으로 초기 페이즈와 시작 시간 설정
+        self._bulk_cycle[candidates] = cycle_time
+        self._bulk_green[candidates] = cycle_time * green_ratio
+        self._bulk_red_first[candidates] = self._rng.random(count) >= green_ratio
+        self._bulk_phase_start[candidates] = self._rng.uniform(0, cycle_time)
+        self._bulk_generation += 1
+    
+    def _sync_bulk(self):
+        """도로 네트워크 인덱스가 다시 생성되었으면 일괄 배치 신호등을 새 엣지 위치로 옮김"""
+        network = self._bulk_network
+        if network is None or network.index_version == self._bulk_version:
+            return
+        
+        new_from, new_to = _edge_node_ids(network)
+        nnz = len(new_from)
+        
+        # 신호등이 있던 엣지를 (출발, 도착) 노드 ID로 새 위치에서 찾기 (삭제된 엣지는 버림)
+        lit = np.flatnonzero(self._bulk_cycle > 0)
+        old_pos, new_pos = [], []
+        for old, from_node, to_node in zip(lit.tolist(), self._bulk_from[lit].tolist(),
+                                           self._bulk_to[lit].tolist()):
+            edge = network.edge_index(from_node, to_node)
+            if edge is not None:
+                old_pos.append(old)
+                new_pos.append(edge)
+        
+        cycle = np.full(nnz, -1.0, dtype=np.float32)
+        green = np.zeros(nnz, dtype=np.float32)
+        phase_start = np.zeros(nnz, dtype=np.float32)
+        red_first = np.zeros(nnz, dtype=np.bool_)
+        cycle[new_pos] = self._bulk_cycle[old_pos]
+        green[new_pos] = self._bulk_green[old_pos]
+        phase_start[new_pos] = self._bulk_phase_start[old_pos]
+        red_first[new_pos] = self._bulk_red_first[old_pos]
+        
+        self._bulk_cycle, self._bulk_green = cycle, green
+        self._bulk_phase_start, self._bulk_red_first = phase_start, red_first
+        self._bulk_from, self._bulk_to = new_from, new_to
+        self._bulk_version = network.index_version
+    
+    def to_edge_arrays(self, road_network) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        신호등 정보를 CSR 엣지 위치 기준의 병렬 배열로 변환
+        
+        Args:
+            road_network: 엣지 위치를 제공하는 도로 네트워크 객체
+            
+        Returns:
+            (cycle, green, phase_start, red_first) 튜플
+            - cycle: float32[nnz] 신호등 주기, 신호등이 없으면 -1
+            - green: float32[nnz] 녹색 신호 시간
+            - phase_start: float32[nnz] 페이즈 시작 시간
+            - red_first: bool[nnz] 초기 페이즈가 빨간 신호인지 여부
+        """
+        if self._bulk_network is road_network:
+            self._sync_bulk()
+            cycle = self._bulk_cycle.copy()
+            green = self._bulk_green.copy()
+            phase_start = self._bulk_phase_start.copy()
+            red_first = self._bulk_red_first.copy()
+        else:
+            nnz = len(road_network.to_csr()[1])
+            cycle = np.full(nnz, -1.0, dtype=np.float32)
+            green = np.zeros(nnz, dtype=np.float32)
+            phase_start = np.zeros(nnz, dtype=np.float32)
+            red_first = np.zeros(nnz, dtype=np.bool_)
+        
+        # 직접 추가한 신호등이 일괄 배치한 신호등보다 우선
+        for (from_node, to_node), traffic_light in self.traffic_lights.items():
+            edge = road_network.edge_index(from_node, to_node)
+            if edge is None:
+                continue
+            
+            cycle[edge] = traffic_light.cycle_time
+            green[edge] = traffic_light.green_time
+            phase_start[edge] = traffic_light.phase_start_time
+            red_first[edge] = traffic_light.current_phase == 'red'
+        
+        return cycle, green, phase_start, red_first